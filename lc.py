@@ -1,191 +1,1013 @@
+import itertools
 import re
 import sys
+import weakref
+from array import array
+
+try:
+    import lc_core  # Optional compiled normalizer, see lc_core.pyx
+except ImportError:
+    lc_core = None
+
+# Define the Lambda calculus data structures. Each class has an integer TAG,
+# used to index the dispatch tables of the hot traversals.
+TAG_VAR = 0
+TAG_LAM = 1
+TAG_APP = 2
+TAG_THUNK = 3
 
-# Define the Lambda calculus data structures
 class Var:
     """Represents a variable."""
+    __slots__ = ('name', 'free_vars', '_hash', '__weakref__')
+    TAG = TAG_VAR
+
     def __init__(self, name):
         self.name = name
+        self.free_vars = frozenset((name,))
+        self._hash = hash(name)
 
     def __repr__(self):
         return self.name
 
     def __eq__(self, other):
-        return isinstance(other, Var) and self.name == other.name
+        return self is other  # Variables are interned by mk_var
+
+    def __hash__(self):
+        return self._hash
+
+# Pool of interned variables, so every occurrence of a name shares one Var
+_var_pool = {}
+
+def mk_var(name):
+    """Returns the interned variable called `name`."""
+    var = _var_pool.get(name)
+    if var is None:
+        var = _var_pool[name] = Var(name)
+    return var
 
 class Lambda:
     """Represents a lambda abstraction (λx. body)."""
+    __slots__ = ('param', 'body', 'free_vars', '_hash', '_repr', '__weakref__')
+    TAG = TAG_LAM
+
     def __init__(self, param, body):
         self.param = param  # This is a Var
         self.body = body    # This is another lambda expression
+        self.free_vars = body.free_vars - {param.name}
+        self._hash = hash((Lambda, param._hash, body._hash))
+        self._repr = None
 
     def __repr__(self):
-        return f"(λ{self.param}. {self.body})"
+        if self._repr is None:
+            build_reprs(self)
+        return self._repr
 
     def __eq__(self, other):
-        return isinstance(other, Lambda) and self.param == other.param and self.body == other.body
+        return self is other  # Abstractions are hash-consed by mk_lam
+
+    def __hash__(self):
+        return self._hash
 
 class App:
     """Represents a function application (f x)."""
+    __slots__ = ('func', 'arg', 'free_vars', '_hash', '_repr', '__weakref__')
+    TAG = TAG_APP
+
     def __init__(self, func, arg):
         self.func = func  # Function to be applied
         self.arg = arg    # Argument to apply
+        self.free_vars = func.free_vars | arg.free_vars
+        self._hash = hash((App, func._hash, arg._hash))
+        self._repr = None
 
     def __repr__(self):
-        return f"({self.func} {self.arg})"
+        if self._repr is None:
+            build_reprs(self)
+        return self._repr
 
     def __eq__(self, other):
-        return isinstance(other, App) and self.func == other.func and self.arg == other.arg
+        return self is other  # Applications are hash-consed by mk_app
+
+    def __hash__(self):
+        return self._hash
+
+def build_reprs(expr):
+    """Fills in the cached repr of `expr` and of every subterm that lacks one.
+
+    Subterms are visited from an explicit stack, children before parents, so
+    deep terms print without hitting the recursion limit. A subterm shared
+    between terms (hash-consing makes that common) is rendered only once.
+    """
+    work = [expr]
+    while work:
+        node = work[-1]
+        if node.TAG == TAG_LAM:
+            if node.body.TAG in (TAG_LAM, TAG_APP) and node.body._repr is None:
+                work.append(node.body)
+                continue
+            node._repr = f"(λ{node.param}. {node.body})"
+        else:
+            pending = [child for child in (node.arg, node.func)
+                       if child.TAG in (TAG_LAM, TAG_APP) and child._repr is None]
+            if pending:
+                work.extend(pending)
+                continue
+            node._repr = f"({node.func} {node.arg})"
+        work.pop()
+
+# Pools of hash-consed abstractions and applications, keyed by the identities
+# of their children. A pooled node keeps its children alive, so the ids in a
+# key stay valid for as long as the entry exists.
+_lam_pool = weakref.WeakValueDictionary()
+_app_pool = weakref.WeakValueDictionary()
+
+def mk_lam(param, body):
+    """Returns the unique abstraction with the given parameter and body."""
+    key = (id(param), id(body))
+    lam = _lam_pool.get(key)
+    if lam is None:
+        lam = _lam_pool[key] = Lambda(param, body)
+    return lam
+
+def mk_app(func, arg):
+    """Returns the unique application of `func` to `arg`."""
+    key = (id(func), id(arg))
+    app = _app_pool.get(key)
+    if app is None:
+        app = _app_pool[key] = App(func, arg)
+    return app
+
+class Thunk:
+    """A shared, lazily normalized argument (call-by-need).
+
+    Substitution places the same thunk at every occurrence of a parameter, and
+    the first occurrence that gets normalized stores the normal form for the rest.
+    """
+    __slots__ = ('state', 'payload', 'free_vars', '_hash', '__weakref__')
+    TAG = TAG_THUNK
+
+    TODO = 0     # payload is the unevaluated argument
+    DONE = 1     # payload is its normal form
+    WHNF = 2     # payload is its weak head normal form
+    APPLIED = 3  # payload is unevaluated, but was applied once already
+
+    def __init__(self, payload, state=TODO):
+        self.state = state
+        self.payload = payload
+        self.free_vars = payload.free_vars
+        self._hash = payload._hash
+
+    def __repr__(self):
+        return repr(self.payload)
+
+    def __hash__(self):
+        return self._hash
+
+def force_head(thunk, bound=frozenset()):
+    """Returns a thunk's argument for use in head position.
+
+    The first use gets the argument as it is, so its redexes are contracted
+    together with the pending arguments. From the second use on, the weak head
+    normal form is computed once and kept.
+    """
+    if thunk.state == Thunk.TODO:
+        thunk.state = Thunk.APPLIED
+        return thunk.payload
+    if thunk.state == Thunk.APPLIED:
+        thunk.payload = whnf(thunk.payload, bound)
+        thunk.state = Thunk.WHNF
+    return thunk.payload
 
 # Context for storing named lambda expressions
 context = {}
+# The definitions as they were given, in the order the names were first added
+_definitions = {}
+# Bumped whenever the context changes, so cached normal forms can be invalidated
+context_generation = 0
 
 # Function to add a name to the context
 def add_to_context(name, expr):
-    context[name] = expr
-
-# Alpha-renaming to avoid variable capture
-def alpha_rename(expr, existing_vars):
-    """Rename bound variables to avoid conflicts with existing variables in the expression."""
-    if isinstance(expr, Var):
-        if expr.name in existing_vars:
-            return Var(expr.name + "_renamed")  # Avoid conflicts
-        else:
-            return expr
-    elif isinstance(expr, Lambda):
-        new_param_name = expr.param.name
-        if new_param_name in existing_vars:
-            new_param_name = new_param_name + "_renamed"
-        return Lambda(Var(new_param_name), alpha_rename(expr.body, existing_vars + [new_param_name]))
-    elif isinstance(expr, App):
-        return App(alpha_rename(expr.func, existing_vars), alpha_rename(expr.arg, existing_vars))
+    global context_generation
+    redefined = name in _definitions
+    _definitions[name] = expr
+    if redefined:
+        # Entries added since may have inlined the old definition, so expand
+        # them all again, in the order their names were first added
+        context.clear()
+        for other, definition in _definitions.items():
+            context[other] = expand_definition(other, definition)
+    else:
+        context[name] = expand_definition(name, expr)
+    context_generation += 1
 
-# Custom substitution function for named expressions
-def substitute_named(expr, name, value):
-    """Substitutes a named expression into the lambda expression."""
-    if isinstance(expr, Var):
-        if expr.name == name:
-            # Replace the name with the value (with renamed bound variables to avoid conflicts)
-            return alpha_rename(value, [name])
-        else:
-            return expr
-    elif isinstance(expr, Lambda):
-        if expr.param.name == name:
-            return expr  # If the variable is bound in this abstraction, don't substitute
+def expand_definition(name, expr):
+    """Returns the context entry for the definition `name = expr`."""
+    if name in expr.free_vars:
+        # Recursive definitions keep referring to themselves by name and are
+        # expanded lazily
+        return expr
+    # Inline the definitions this one refers to, so lookups during reduction
+    # return a term that needs no further expansion
+    return fully_expand(expr)
+
+def fully_expand(expr):
+    """Substitutes every context name occurring free in `expr` with its definition.
+
+    Each entry already has the entries added before it inlined, so one pass is
+    enough. Names that were not defined yet, such as forward references, stay
+    names and are expanded during reduction.
+    """
+    env = {name: context[name] for name in expr.free_vars if name in context}
+    return eval_env(expr, env) if env else expr
+
+# Source of numeric suffixes for renamed variables
+_gensym_counter = itertools.count()
+
+def fresh_name(name, avoid):
+    """Returns a variant of `name` that does not occur in `avoid`.
+
+    The variant is the name's base (the part before any '#') followed by
+    '#' and a new number, so renaming an already renamed variable does not
+    make its name grow.
+    """
+    if name not in avoid:
+        return name
+    base = name.partition('#')[0]
+    while name in avoid:
+        name = f"{base}#{next(_gensym_counter)}"
+    return name
+
+# Recursion depth up to which eval_env recurses. Deeper subterms are handed to
+# an explicit stack, which has no depth limit but costs more per call on the
+# small terms that most contractions substitute into
+EVAL_ENV_DEPTH = 200
+
+# Environment-based substitution: applies every pending binding in one walk
+def eval_env(expr, env, depth=EVAL_ENV_DEPTH):
+    """Substitutes each name in `env` with its expression throughout `expr`.
+
+    All bindings are applied simultaneously in a single traversal, and subterms
+    that mention none of the bound names are returned as they are. Below
+    `depth` levels of nesting the traversal continues on an explicit stack.
+    """
+    if env.keys().isdisjoint(expr.free_vars):
+        return expr
+    if not depth:
+        return _eval_env_deep(expr, env)
+    return _EVAL_ENV[expr.TAG](expr, env, depth - 1)
+
+def _eval_env_var(expr, env, depth):
+    return env[expr.name]
+
+def _eval_env_lam(expr, env, depth):
+    param, env = _enter_lam(expr, env)
+    new_body = eval_env(expr.body, env, depth)
+    return expr if param is expr.param and new_body is expr.body else mk_lam(param, new_body)
+
+def _eval_env_app(expr, env, depth):
+    new_func = eval_env(expr.func, env, depth)
+    new_arg = eval_env(expr.arg, env, depth)
+    if new_func is expr.func and new_arg is expr.arg:
+        return expr
+    return mk_app(new_func, new_arg)
+
+def _eval_env_thunk(expr, env, depth):
+    return Thunk(eval_env(expr.payload, env, depth), _thunk_state(expr, env))
+
+_EVAL_ENV = (_eval_env_var, _eval_env_lam, _eval_env_app, _eval_env_thunk)
+
+# Tasks on _eval_env_deep's work stack
+_SUBST = 0          # substitute into a subterm
+_REBUILD_LAM = 1    # wrap the last result in the abstraction's (possibly renamed) parameter
+_REBUILD_APP = 2    # apply the second-to-last result to the last one
+_REBUILD_THUNK = 3  # share the last result in a new thunk
+
+def _eval_env_deep(expr, env):
+    # eval_env for subterms nested too deeply to recurse into: pending work is
+    # kept on an explicit stack and finished subterms on a result stack
+    work = [(_SUBST, expr, env)]
+    results = []
+    while work:
+        kind, expr, extra = work.pop()
+        if kind == _SUBST:
+            if extra.keys().isdisjoint(expr.free_vars):
+                results.append(expr)
+                continue
+            tag = expr.TAG
+            if tag == TAG_VAR:
+                results.append(extra[expr.name])
+            elif tag == TAG_APP:
+                # The function is on top, so its result is pushed first
+                work.append((_REBUILD_APP, expr, None))
+                work.append((_SUBST, expr.arg, extra))
+                work.append((_SUBST, expr.func, extra))
+            elif tag == TAG_LAM:
+                param, env = _enter_lam(expr, extra)
+                work.append((_REBUILD_LAM, expr, param))
+                work.append((_SUBST, expr.body, env))
+            else:
+                work.append((_REBUILD_THUNK, expr, _thunk_state(expr, extra)))
+                work.append((_SUBST, expr.payload, extra))
+        elif kind == _REBUILD_APP:
+            arg = results.pop()
+            func = results.pop()
+            results.append(expr if func is expr.func and arg is expr.arg else mk_app(func, arg))
+        elif kind == _REBUILD_LAM:
+            body = results.pop()
+            results.append(expr if extra is expr.param and body is expr.body else mk_lam(extra, body))
         else:
-            return Lambda(expr.param, substitute_named(expr.body, name, value))
-    elif isinstance(expr, App):
-        return App(substitute_named(expr.func, name, value), substitute_named(expr.arg, name, value))
-    return expr
+            results.append(Thunk(results.pop(), extra))
+    return results.pop()
+
+def _thunk_state(expr, env):
+    # The state of the thunk that shares `expr`'s payload after substitution
+    if expr.state != Thunk.TODO and any(env[name].TAG != TAG_VAR for name in expr.free_vars if name in env):
+        # Substituting anything but a variable may create new redexes
+        return Thunk.TODO
+    return expr.state
+
+def _enter_lam(expr, env):
+    # Returns the parameter to rebuild `expr` with and the bindings that apply
+    # to its body
+    name = expr.param.name
+    body = expr.body
+    if name in env:
+        # The parameter shadows this binding inside the body
+        env = {key: value for key, value in env.items() if key != name}
+    values = [value for key, value in env.items() if key in body.free_vars]
+    if any(name in value.free_vars for value in values):
+        # The parameter would capture a free variable of a substituted value,
+        # so rename it as part of the same traversal
+        avoid = set(body.free_vars)
+        for value in values:
+            avoid |= value.free_vars
+        param = mk_var(fresh_name(name, avoid))
+        env = dict(env)
+        env[name] = param
+        return param, env
+    return expr.param, env
 
 # Substitution function for beta-reduction
 def substitute(expr, var, value):
     """Substitutes the variable `var` with the expression `value` in `expr`."""
-    if isinstance(expr, Var):
-        if expr.name == var.name:
-            return value  # Substitute variable with its value
-        else:
-            return expr   # Variable does not match, return unchanged
-    elif isinstance(expr, Lambda):
-        if expr.param.name == var.name:
-            return expr  # If variable is bound in this abstraction, don't substitute
-        else:
-            return Lambda(expr.param, substitute(expr.body, var, value))
-    elif isinstance(expr, App):
-        # Perform substitution in both the function and argument
-        return App(substitute(expr.func, var, value), substitute(expr.arg, var, value))
-    return expr
+    return eval_env(expr, {var.name: value})
 
-# Beta-reduction: Apply function to argument (function application)
-# Updated beta-reduction logic to handle named expressions correctly
-def beta_reduce(expr):
-    """Performs a single beta-reduction step, expanding named expressions."""
-    if isinstance(expr, Var) and expr.name in context:
+# Custom substitution function for named expressions
+def substitute_named(expr, name, value):
+    """Substitutes a named expression into the lambda expression."""
+    return eval_env(expr, {name: value})
+
+# De Bruijn terms: bound variables are referred to by how many abstractions
+# out they are bound, so substitution never needs to rename anything. Free
+# variables stay as (named) Var nodes.
+class DBVar:
+    """Represents a bound variable by its de Bruijn index."""
+    __slots__ = ('index',)
+
+    def __init__(self, index):
+        self.index = index
+
+    def __repr__(self):
+        return f"#{self.index}"
+
+class DBLam:
+    """Represents an abstraction; `hint` keeps the original parameter name for printing."""
+    __slots__ = ('body', 'hint')
+
+    def __init__(self, body, hint):
+        self.body = body
+        self.hint = hint
+
+    def __repr__(self):
+        return f"(λ{self.hint}. {self.body})"
+
+class DBApp:
+    """Represents a function application on de Bruijn terms."""
+    __slots__ = ('func', 'arg')
+
+    def __init__(self, func, arg):
+        self.func = func
+        self.arg = arg
+
+    def __repr__(self):
+        return f"({self.func} {self.arg})"
+
+def to_db(expr, env=None, depth=0):
+    """Converts a named expression to a de Bruijn term.
+
+    `env` maps each bound name to the depth of the abstraction binding it.
+    """
+    if env is None:
+        env = {}
+    return _TO_DB[expr.TAG](expr, env, depth)
+
+def _to_db_var(expr, env, depth):
+    level = env.get(expr.name)
+    return expr if level is None else DBVar(depth - level - 1)
+
+def _to_db_lam(expr, env, depth):
+    name = expr.param.name
+    outer = env.get(name)
+    env[name] = depth
+    body = to_db(expr.body, env, depth + 1)
+    if outer is None:
+        del env[name]
+    else:
+        env[name] = outer
+    return DBLam(body, name)
+
+def _to_db_app(expr, env, depth):
+    return DBApp(to_db(expr.func, env, depth), to_db(expr.arg, env, depth))
+
+def _to_db_thunk(expr, env, depth):
+    return to_db(expr.payload, env, depth)
+
+_TO_DB = (_to_db_var, _to_db_lam, _to_db_app, _to_db_thunk)
+
+def db_free_names(term, names=None):
+    """Collects the names of the free variables of a de Bruijn term."""
+    if names is None:
+        names = set()
+    if isinstance(term, Var):
+        names.add(term.name)
+    elif isinstance(term, DBLam):
+        db_free_names(term.body, names)
+    elif isinstance(term, DBApp):
+        db_free_names(term.func, names)
+        db_free_names(term.arg, names)
+    return names
+
+def db_mentions(term, index):
+    """Checks whether the variable with de Bruijn index `index` occurs in `term`."""
+    if isinstance(term, DBVar):
+        return term.index == index
+    elif isinstance(term, DBLam):
+        return db_mentions(term.body, index + 1)
+    elif isinstance(term, DBApp):
+        return db_mentions(term.func, index) or db_mentions(term.arg, index)
+    return False
+
+def from_db(term, names=None, free=None):
+    """Converts a de Bruijn term back to a named expression.
+
+    Parameters keep their hint unless it names a free variable, or shadows an
+    enclosing parameter that the body still refers to; then they are renamed.
+    """
+    if names is None:
+        names = []
+        free = db_free_names(term)
+    if isinstance(term, DBVar):
+        return mk_var(names[len(names) - 1 - term.index])
+    elif isinstance(term, DBLam):
+        name = term.hint
+        clash = name in free
+        if not clash and name in names:
+            outer = len(names) - 1 - names[::-1].index(name)
+            clash = db_mentions(term.body, len(names) - outer)
+        if clash:
+            name = fresh_name(name, free.union(names))
+        names.append(name)
+        body = from_db(term.body, names, free)
+        names.pop()
+        return mk_lam(mk_var(name), body)
+    elif isinstance(term, DBApp):
+        return mk_app(from_db(term.func, names, free), from_db(term.arg, names, free))
+    return term
+
+def shift(term, d, c=0):
+    """Adds `d` to every de Bruijn index in `term` that is at least `c`."""
+    if isinstance(term, DBVar):
+        return DBVar(term.index + d) if term.index >= c else term
+    elif isinstance(term, DBLam):
+        body = shift(term.body, d, c + 1)
+        return term if body is term.body else DBLam(body, term.hint)
+    elif isinstance(term, DBApp):
+        func = shift(term.func, d, c)
+        arg = shift(term.arg, d, c)
+        return term if func is term.func and arg is term.arg else DBApp(func, arg)
+    return term
+
+def subst_db(term, j, s):
+    """Substitutes `s` for the variable with index `j` in `term`."""
+    if isinstance(term, DBVar):
+        return s if term.index == j else term
+    elif isinstance(term, DBLam):
+        body = subst_db(term.body, j + 1, shift(s, 1))
+        return term if body is term.body else DBLam(body, term.hint)
+    elif isinstance(term, DBApp):
+        func = subst_db(term.func, j, s)
+        arg = subst_db(term.arg, j, s)
+        return term if func is term.func and arg is term.arg else DBApp(func, arg)
+    return term
+
+def beta_reduce_db(term):
+    """Performs a single beta-reduction step on a de Bruijn term, expanding named expressions."""
+    if isinstance(term, Var) and term.name in context:
         # If it's a named expression, expand it
-        return context[expr.name]
-    
-    if isinstance(expr, App):
-        if isinstance(expr.func, Lambda):
+        return to_db(context[term.name])
+
+    if isinstance(term, DBApp):
+        if isinstance(term.func, DBLam):
             # Beta-reduction step: substitute the argument into the function body
-            return substitute(expr.func.body, expr.func.param, expr.arg)
+            return shift(subst_db(term.func.body, 0, shift(term.arg, 1)), -1)
         else:
             # Recursively reduce function and argument
-            reduced_func = beta_reduce(expr.func)
-            reduced_arg = beta_reduce(expr.arg)
-            return App(reduced_func, reduced_arg)
-    elif isinstance(expr, Lambda):
+            func = beta_reduce_db(term.func)
+            arg = beta_reduce_db(term.arg)
+            return term if func is term.func and arg is term.arg else DBApp(func, arg)
+    elif isinstance(term, DBLam):
         # Recursively reduce the body of the lambda
-        return Lambda(expr.param, beta_reduce(expr.body))
+        body = beta_reduce_db(term.body)
+        return term if body is term.body else DBLam(body, term.hint)
     else:
-        return expr  # For variables, return unchanged
+        return term  # For variables, return unchanged
+
+# Beta-reduction: Apply function to argument (function application)
+def beta_reduce(expr):
+    """Performs a single beta-reduction step, expanding named expressions.
+
+    Kept for stepping through a reduction; `interpret` uses `normalize`.
+    """
+    return from_db(beta_reduce_db(to_db(expr)))
+
+# Normal forms of closed subterms, keyed by the subterm itself so entries go
+# away once the subterm is no longer referenced
+_nf_cache = weakref.WeakKeyDictionary()
+
+def is_closed(expr, bound=frozenset()):
+    """Checks whether every free variable of `expr` names a context entry.
+
+    Names in `bound` are parameters of enclosing abstractions, which shadow
+    the context entries of the same name.
+    """
+    return all(name in context for name in expr.free_vars) and bound.isdisjoint(expr.free_vars)
+
+# Tasks on normalize's work stack
+_NORMALIZE = 0    # reduce a subterm to normal form
+_WRAP_LAM = 1     # wrap the last result in the abstraction it is the body of
+_APPLY = 2        # apply the second-to-last result to the last one
+_STORE_THUNK = 3  # keep the last result as the thunk's normal form
+_STORE_NF = 4     # cache the last result as the subterm's normal form
+
+# Normal-order normalizer: reduces each redex as it is reached instead of
+# rebuilding the whole tree and comparing it against the previous step
+def normalize(expr, bound=frozenset()):
+    """Reduces a lambda expression to its normal form (leftmost-outermost first).
+
+    The head of an application is reduced to weak head normal form before
+    anything else; arguments and abstraction bodies are normalized only once
+    the head is stuck on a free variable. Named expressions are expanded
+    unless `bound`, the context names that enclosing parameters shadow,
+    contains them.
+
+    Subterms still to be normalized are kept on an explicit stack and finished
+    ones on a result stack, so deep normal forms do not hit the recursion limit.
+    """
+    work = [(_NORMALIZE, expr, bound)]
+    results = []
+    while work:
+        kind, expr, extra = work.pop()
+        if kind == _NORMALIZE:
+            _unwind(expr, extra, work, results)
+        elif kind == _APPLY:
+            arg = results.pop()
+            results.append(mk_app(results.pop(), arg))
+        elif kind == _WRAP_LAM:
+            body = results.pop()
+            results.append(expr if body is expr.body else mk_lam(expr.param, body))
+        elif kind == _STORE_THUNK:
+            expr.payload = results[-1]
+            expr.state = Thunk.DONE
+        elif results[-1] is not expr:  # A normal form pointing at its own key would never be freed
+            _nf_cache[expr] = (context_generation, results[-1])
+    return results.pop()
+
+def contract(lam, args):
+    """Applies `lam` to `args` (last argument first), contracting nested redexes at once.
+
+    For `(λx.λy.t) a b` the bindings x := a and y := b are collected and
+    substituted into t in a single traversal. Application arguments are shared
+    through thunks so each is normalized at most once. The consumed arguments
+    are popped off `args`; any left over once the abstractions run out stay
+    there for the caller to apply.
+    """
+    env = {}
+    head = lam
+    while args and head.TAG == TAG_LAM:
+        arg = args.pop()
+        if arg.TAG == TAG_APP:
+            arg = Thunk(arg)
+        env[head.param.name] = arg  # A repeated parameter shadows the earlier binding
+        head = head.body
+    return eval_env(head, env)
+
+def _unwind(expr, bound, work, results):
+    # Reduces `expr` until its normal form is known, which goes on `results`,
+    # or until it needs the normal forms of subterms, which are pushed on
+    # `work` together with the tasks that combine them
+    if expr.TAG == TAG_THUNK:
+        if expr.state == Thunk.DONE:
+            results.append(expr.payload)
+        else:
+            work.append((_STORE_THUNK, expr, None))
+            work.append((_NORMALIZE, expr.payload, bound))
+        return
+    if is_closed(expr, bound):
+        cached = _nf_cache.get(expr)
+        if cached is not None and cached[0] == context_generation:
+            results.append(cached[1])
+            return
+        work.append((_STORE_NF, expr, None))
+
+    # Reduce the head of the application spine to weak head normal form first;
+    # args holds the pending arguments, last argument first
+    args = []
+    while True:
+        tag = expr.TAG
+        if tag == TAG_APP:
+            args.append(expr.arg)
+            expr = expr.func
+        elif tag == TAG_LAM:
+            if args:
+                # Head redex: contract it, together with any redexes of the
+                # abstractions directly under it, and continue with the result
+                expr = contract(expr, args)
+                continue
+            name = expr.param.name
+            if name in context and name not in bound:
+                bound = bound | {name}  # The parameter shadows the context entry
+            work.append((_WRAP_LAM, expr, None))
+            work.append((_NORMALIZE, expr.body, bound))
+            return
+        elif tag == TAG_VAR:
+            if expr.name not in context or expr.name in bound:
+                break
+            # Expand the named expression in head position and keep unwinding
+            expr = context[expr.name]
+        else:
+            if not args:
+                work.append((_NORMALIZE, expr, bound))
+                return
+            # A shared argument in head position only needs its weak head
+            # normal form, which the thunk keeps for its other occurrences
+            expr = force_head(expr, bound)
+
+    # The spine is stuck on a free variable: only now normalize the arguments,
+    # the first argument (last on args) first
+    results.append(expr)
+    for arg in args:
+        work.append((_APPLY, None, None))
+        work.append((_NORMALIZE, arg, bound))
+
+def whnf(expr, bound=frozenset()):
+    """Reduces `expr` to weak head normal form.
+
+    The result is an abstraction, or an application spine stuck on a free
+    variable with its arguments left unreduced.
+    """
+    args = []
+    while True:
+        tag = expr.TAG
+        if tag == TAG_APP:
+            args.append(expr.arg)
+            expr = expr.func
+        elif tag == TAG_LAM:
+            if not args:
+                return expr
+            expr = contract(expr, args)
+        elif tag == TAG_VAR:
+            if expr.name not in context or expr.name in bound:
+                break
+            expr = context[expr.name]
+        else:
+            expr = force_head(expr, bound)
+
+    while args:
+        expr = mk_app(expr, args.pop())
+    return expr
+
+# Conversion to and from the compiled normalizer's nodes. Shared subterms
+# are converted once, so hash-consed terms stay shared on both sides. Both
+# directions visit subterms from an explicit stack, children before parents,
+# so deep terms convert without hitting the recursion limit.
+def to_core(expr, memo=None):
+    """Converts an expression to an `lc_core.Node`."""
+    if memo is None:
+        memo = {}
+    work = [expr]
+    while work:
+        expr = work[-1]
+        if expr in memo:
+            work.pop()
+            continue
+        if expr.TAG == TAG_VAR:
+            memo[expr] = lc_core.var(expr.name)
+        elif expr.TAG == TAG_LAM:
+            if expr.body not in memo:
+                work.append(expr.body)
+                continue
+            memo[expr] = lc_core.lam(expr.param.name, memo[expr.body])
+        else:
+            pending = [child for child in (expr.arg, expr.func) if child not in memo]
+            if pending:
+                work.extend(pending)
+                continue
+            memo[expr] = lc_core.app(memo[expr.func], memo[expr.arg])
+        work.pop()
+    return memo[expr]
+
+def from_core(node, memo=None):
+    """Converts an `lc_core.Node` back to an expression."""
+    if memo is None:
+        memo = {}  # Keyed by id: nodes outlive the conversion, so ids are stable
+    work = [node]
+    while work:
+        node = work[-1]
+        if id(node) in memo:
+            work.pop()
+            continue
+        if node.tag == lc_core.TAG_VAR:
+            memo[id(node)] = mk_var(node.name)
+        elif node.tag == lc_core.TAG_LAM:
+            if id(node.left) not in memo:
+                work.append(node.left)
+                continue
+            memo[id(node)] = mk_lam(mk_var(node.name), memo[id(node.left)])
+        else:
+            pending = [child for child in (node.right, node.left) if id(child) not in memo]
+            if pending:
+                work.extend(pending)
+                continue
+            memo[id(node)] = mk_app(memo[id(node.left)], memo[id(node.right)])
+        work.pop()
+    return memo[id(node)]
+
+# The context converted to nodes, rebuilt whenever the context changes
+_core_context = {}
+_core_generation = None
+
+def core_context():
+    """Returns the context with every definition converted to an `lc_core.Node`."""
+    global _core_generation
+    if _core_generation != context_generation:
+        memo = {}
+        _core_context.clear()
+        for name, expr in context.items():
+            _core_context[name] = to_core(expr, memo)
+        _core_generation = context_generation
+    return _core_context
 
 # Interpreter function with full expansion of named expressions
 def interpret(expr):
     """Interprets (reduces) a lambda expression until it cannot be reduced further."""
-    prev_expr = None
-    while expr != prev_expr:  # Keep reducing until no change
-        prev_expr = expr
-        expr = beta_reduce(expr)
-    return expr
+    if lc_core is not None:
+        return from_core(lc_core.normalize(to_core(expr), core_context()))
+    return normalize(expr)
+
+# Bytecode compilation: terms are flattened in post-order into parallel arrays
+# of opcodes, operands and subtree sizes, and run on a Krivine machine. A
+# node's last child ends just before it, and the sizes let the machine step
+# over a whole subtree without visiting it.
+OP_VAR = 0   # operand: de Bruijn index of the variable
+OP_LAM = 1   # operand: const holding the parameter name; the body ends at pc - 1
+OP_APP = 2   # operand unused; the argument ends at pc - 1, the function just before it
+OP_FREE = 3  # operand: const holding the name, looked up in the context when reached
+
+def compile_to_bc(term):
+    """Compiles a de Bruijn term into an `(ops, operands, sizes, consts)` program.
+
+    The root is the last node. The term is walked with an explicit stack, so
+    deep terms do not hit the recursion limit.
+    """
+    ops = array('i')
+    operands = array('i')
+    sizes = array('i')
+    consts = []
+    const_index = {}
+
+    def const(value):
+        if value not in const_index:
+            const_index[value] = len(consts)
+            consts.append(value)
+        return const_index[value]
+
+    work = [(term, False)]
+    while work:
+        term, children_done = work.pop()
+        if isinstance(term, DBVar):
+            ops.append(OP_VAR)
+            operands.append(term.index)
+            sizes.append(1)
+        elif isinstance(term, Var):
+            ops.append(OP_FREE)
+            operands.append(const(term.name))
+            sizes.append(1)
+        elif not children_done:
+            # Emit the children first, then come back for this node
+            work.append((term, True))
+            if isinstance(term, DBLam):
+                work.append((term.body, False))
+            else:
+                work.append((term.arg, False))
+                work.append((term.func, False))
+        elif isinstance(term, DBLam):
+            ops.append(OP_LAM)
+            operands.append(const(term.hint))
+            sizes.append(1 + sizes[-1])
+        else:
+            arg_size = sizes[-1]
+            ops.append(OP_APP)
+            operands.append(0)
+            sizes.append(1 + arg_size + sizes[-1 - arg_size])
+    return ops, operands, sizes, consts
+
+# Compiled programs for context entries, rebuilt whenever the context changes
+_global_code = {}
+_global_generation = None
+
+def global_code(name):
+    """Returns the compiled program for the context entry `name`."""
+    global _global_generation
+    if _global_generation != context_generation:
+        _global_code.clear()
+        _global_generation = context_generation
+    prog = _global_code.get(name)
+    if prog is None:
+        prog = _global_code[name] = compile_to_bc(to_db(context[name]))
+    return prog
+
+def vm(prog, pc, env, stack):
+    """Runs a Krivine machine until the term reaches weak head normal form.
+
+    Closures are `(prog, pc, env)` triples and environments are linked
+    `(value, rest)` pairs. While reading back under a binder the environment
+    holds the binder's level (an int) instead of a closure. Returns
+    `(OP_LAM, prog, pc, env)` for an abstraction, `(OP_VAR, level, stack)` for
+    a stuck bound variable and `(OP_FREE, name, stack)` for a stuck free one,
+    where `stack` holds the pending argument closures, last argument first.
+    """
+    ops, operands, sizes, consts = prog
+    while True:
+        op = ops[pc]
+        if op == OP_APP:
+            # Delay the argument and skip over it to the function
+            pc -= 1
+            stack.append((prog, pc, env))
+            pc -= sizes[pc]
+        elif op == OP_LAM:
+            if not stack:
+                return (OP_LAM, prog, pc, env)
+            env = (stack.pop(), env)
+            pc -= 1
+        elif op == OP_VAR:
+            for _ in range(operands[pc]):
+                env = env[1]
+            value = env[0]
+            if type(value) is int:
+                return (OP_VAR, value, stack)
+            prog, pc, env = value
+            ops, operands, sizes, consts = prog
+        else:
+            name = consts[operands[pc]]
+            if name not in context:
+                return (OP_FREE, name, stack)
+            prog, env = global_code(name), None
+            ops, operands, sizes, consts = prog
+            pc = len(ops) - 1
+
+# Tasks on read_back's work stack
+_READ = 0   # run a closure to weak head normal form
+_BUILD_LAM = 1  # wrap the last result in an abstraction and leave its scope
+_BUILD_APP = 2  # apply the second-to-last result to the last one
+
+def read_back(prog, pc, env, names, avoid):
+    """Normalizes a closure and converts the result back into named syntax.
+
+    Pending work is kept on an explicit stack and finished subterms on a
+    result stack, so deep normal forms do not hit the recursion limit.
+    """
+    work = [(_READ, prog, pc, env)]
+    results = []
+    while work:
+        task = work.pop()
+        kind = task[0]
+        if kind == _READ:
+            result = vm(task[1], task[2], task[3], [])
+            if result[0] == OP_LAM:
+                _, prog, pc, env = result
+                name = fresh_name(prog[3][prog[1][pc]], avoid)
+                level = len(names)
+                names.append(name)
+                avoid.add(name)
+                work.append((_BUILD_LAM, name))
+                work.append((_READ, prog, pc - 1, (level, env)))
+            else:
+                head_kind, head, stack = result
+                results.append(mk_var(names[head] if head_kind == OP_VAR else head))
+                # The first argument is on top of the stack and must be read first
+                for closure in stack:
+                    work.append((_BUILD_APP,))
+                    work.append((_READ,) + closure)
+        elif kind == _BUILD_LAM:
+            name = names.pop()
+            avoid.discard(name)
+            results.append(mk_lam(mk_var(name), results.pop()))
+        else:
+            arg = results.pop()
+            results.append(mk_app(results.pop(), arg))
+    return results.pop()
+
+def reachable_names(expr):
+    """Collects the free names of `expr` and, transitively, of the context entries they refer to."""
+    seen = set()
+    pending = list(expr.free_vars)
+    while pending:
+        name = pending.pop()
+        if name not in seen:
+            seen.add(name)
+            if name in context:
+                pending.extend(context[name].free_vars)
+    return seen
+
+def interpret_bc(expr):
+    """Interprets a lambda expression by compiling it to bytecode and running the VM."""
+    prog = compile_to_bc(to_db(expr))
+    # Binders are named after the original parameters, renamed where they would
+    # clash with an enclosing binder or a free variable
+    return read_back(prog, len(prog[0]) - 1, None, [], reachable_names(expr))
 
 # Parsing Functionality
 def tokenize(expression):
-    """Tokenizes the input string into meaningful parts with position tracking."""
+    """Tokenizes the input string, returning the tokens and their start positions."""
     tokens = []
-    position = 0
+    positions = []  # Only consulted when reporting syntax errors
 
     for match in re.finditer(r'λ|[().]|[^\s()λ.]+', expression):
-        token = match.group(0)
-        start_pos = match.start()
-        end_pos = match.end()
-        tokens.append((token, start_pos, end_pos))
-        position = end_pos
+        tokens.append(match.group(0))
+        positions.append(match.start())
 
-    return tokens
+    return tokens, positions
 
-def parse(tokens):
-    """Parses tokens into a lambda expression."""
-    if not tokens:
-        raise SyntaxError("Empty expression")
-    
-    def parse_single(tokens):
-        token, start_pos, end_pos = tokens.pop(0)
-
-        if token == 'λ':  # Lambda abstraction
-            if not tokens:
-                raise SyntaxError(f"Expected parameter after 'λ' at position {start_pos}")
-            param, param_start, param_end = tokens.pop(0)  # The parameter
-            if not tokens or tokens[0][0] != '.':
+class Parser:
+    """Parses a token list into a lambda expression by walking an index over it."""
+    def __init__(self, toks, positions):
+        self.toks = toks
+        self.positions = positions
+        self.i = 0
+
+    def parse(self):
+        """Parses an expression, applying consecutive terms left-associatively."""
+        toks = self.toks
+        if self.i >= len(toks):
+            raise SyntaxError("Empty expression")
+
+        # Parse a single expression (either a variable, lambda, or nested expression)
+        expr = self.parse_single()
+
+        # Handle function application (left-associative)
+        while self.i < len(toks) and toks[self.i] not in (')', '.'):  # Stop at a closing parenthesis or dot
+            expr = mk_app(expr, self.parse_single())
+
+        return expr
+
+    def parse_single(self):
+        """Parses a variable, a lambda abstraction or a parenthesized expression."""
+        toks = self.toks
+        start = self.i
+        t = toks[self.i]
+        self.i += 1
+
+        if t == 'λ':  # Lambda abstraction
+            if self.i >= len(toks):
+                raise SyntaxError(f"Expected parameter after 'λ' at position {self.positions[start]}")
+            param = toks[self.i]  # The parameter
+            self.i += 1
+            if self.i >= len(toks) or toks[self.i] != '.':
+                param_end = self.positions[self.i - 1] + len(param)
                 raise SyntaxError(f"Expected '.' after lambda parameter '{param}' at position {param_end}")
-            tokens.pop(0)  # Remove the dot
-            body = parse(tokens)  # Parse the body
-            return Lambda(Var(param), body)
-        elif token == '(':  # Start of an application or nested expression
-            expr = parse(tokens)  # Parse the first part
-            if not tokens or tokens[0][0] != ')':
-                raise SyntaxError(f"Expected ')' at position {start_pos}")
-            tokens.pop(0)  # Remove closing parenthesis
+            self.i += 1  # Skip the dot
+            body = self.parse()  # Parse the body
+            return mk_lam(mk_var(param), body)
+        elif t == '(':  # Start of an application or nested expression
+            expr = self.parse()  # Parse the first part
+            if self.i >= len(toks) or toks[self.i] != ')':
+                raise SyntaxError(f"Expected ')' at position {self.positions[start]}")
+            self.i += 1  # Skip the closing parenthesis
             return expr
         else:  # It's a variable
-            return Var(token)  # Return variable
+            return mk_var(t)
 
-    # Parse a single expression (either a variable, lambda, or nested expression)
-    expr = parse_single(tokens)
-
-    # Handle function application (left-associative)
-    while tokens and tokens[0][0] not in [')', '.']:  # While tokens left and not a closing parenthesis or dot
-        next_expr = parse_single(tokens)
-        expr = App(expr, next_expr)
-
-    return expr
+def parse(tokens, positions):
+    """Parses tokens into a lambda expression."""
+    return Parser(tokens, positions).parse()
 
 def parse_expression(expression):
     """Parses a string expression into a Lambda Calculus expression."""
-    tokens = tokenize(expression)
-    return parse(tokens)
+    tokens, positions = tokenize(expression)
+    return parse(tokens, positions)
 
 # REPL Function with support for named expressions
-def repl():
+def repl(evaluate=interpret):
     """Run a simple REPL for Lambda Calculus expressions."""
     print("Welcome to the Lambda Calculus REPL! Type 'exit' to quit.")
     while True:
@@ -203,17 +1025,22 @@ def repl():
             else:
                 parsed_expr = parse_expression(expr_input)
                 print("Parsed expression:", parsed_expr)
-                result = interpret(parsed_expr)
+                result = evaluate(parsed_expr)
                 print("Reduced result:", result)
         except Exception as e:
             print("Error:", e)
 
 # Example usage
 if __name__ == "__main__":
-    if len(sys.argv) > 1 and sys.argv[1] == "--repl":
-        repl()
+    args = sys.argv[1:]
+    evaluate = interpret
+    if "--vm" in args:  # Run on the bytecode VM instead of the tree normalizer
+        args.remove("--vm")
+        evaluate = interpret_bc
+    if args and args[0] == "--repl":
+        repl(evaluate)
     else:
-        with open(sys.argv[1]) as f:
+        with open(args[0]) as f:
             for line in f:
                 line = line.strip()
                 
@@ -230,5 +1057,5 @@ if __name__ == "__main__":
                 else:
                     parsed_expr = parse_expression(line)
                     print("Parsed expression:", parsed_expr)
-                    result = interpret(parsed_expr)
+                    result = evaluate(parsed_expr)
                     print("Reduced result:", result)
@@ -0,0 +1,220 @@
+# cython: language_level=3
+"""Compiled normal-order normalizer used by lc.py when it has been built.
+
+Build it next to lc.py with:
+
+    cythonize -3 -i lc_core.pyx
+
+Terms are Node objects tagged TAG_VAR, TAG_LAM or TAG_APP, so dispatch is an
+integer compare and field access is a struct load. lc.py converts its
+expressions to Nodes with `var`, `lam` and `app` and reads results back
+through the readonly fields. Reduction follows lc.normalize: the head of the
+application spine is reduced to weak head normal form first, curried redexes
+are contracted in one substitution, and application arguments are shared
+through TAG_THUNK nodes that never appear in a result.
+"""
+
+import itertools
+
+cpdef enum:
+    TAG_VAR = 0
+    TAG_LAM = 1
+    TAG_APP = 2
+    TAG_THUNK = 3
+
+# Evaluation states of a thunk, as in lc.Thunk
+cdef enum:
+    TODO = 0     # The payload is the unevaluated argument
+    DONE = 1     # The payload is its normal form
+    WHNF = 2     # The payload is its weak head normal form
+    APPLIED = 3  # The payload is unevaluated, but was applied once already
+
+cdef class Node:
+    """A lambda term: a variable, an abstraction or an application."""
+    cdef readonly int tag
+    cdef readonly str name          # Variable name, or the abstraction's parameter
+    cdef readonly Node left         # Abstraction body, the applied function or a thunk's payload
+    cdef readonly Node right        # Applied argument
+    cdef readonly frozenset free_vars
+    cdef int state                  # A thunk's evaluation state
+
+cpdef Node var(str name):
+    """Builds a variable."""
+    cdef Node node = Node.__new__(Node)
+    node.tag = TAG_VAR
+    node.name = name
+    node.free_vars = frozenset((name,))
+    return node
+
+cpdef Node lam(str param, Node body):
+    """Builds an abstraction binding `param` in `body`."""
+    cdef Node node = Node.__new__(Node)
+    node.tag = TAG_LAM
+    node.name = param
+    node.left = body
+    node.free_vars = body.free_vars - {param}
+    return node
+
+cpdef Node app(Node func, Node arg):
+    """Builds an application of `func` to `arg`."""
+    cdef Node node = Node.__new__(Node)
+    node.tag = TAG_APP
+    node.left = func
+    node.right = arg
+    node.free_vars = func.free_vars | arg.free_vars
+    return node
+
+cdef Node thunk(Node payload, int state):
+    cdef Node node = Node.__new__(Node)
+    node.tag = TAG_THUNK
+    node.left = payload
+    node.free_vars = payload.free_vars
+    node.state = state
+    return node
+
+# Source of numeric suffixes for renamed variables
+_gensym_counter = itertools.count()
+
+cdef str fresh_name(str name, avoid):
+    cdef str base
+    if name not in avoid:
+        return name
+    base = name.partition('#')[0]
+    while name in avoid:
+        name = f"{base}#{next(_gensym_counter)}"
+    return name
+
+cpdef Node substitute(Node expr, dict env):
+    """Substitutes each name in `env` with its Node throughout `expr`, avoiding capture.
+
+    All bindings are applied simultaneously in a single traversal.
+    """
+    cdef Node body, func, arg, value
+    cdef str param, name
+    cdef int state
+    if env.keys().isdisjoint(expr.free_vars):
+        return expr
+    if expr.tag == TAG_VAR:
+        return <Node>env[expr.name]
+    if expr.tag == TAG_APP:
+        func = substitute(expr.left, env)
+        arg = substitute(expr.right, env)
+        return app(func, arg)
+    if expr.tag == TAG_THUNK:
+        state = expr.state
+        if state != TODO:
+            for name in expr.free_vars:
+                # Substituting anything but a variable may create new redexes
+                if name in env and (<Node>env[name]).tag != TAG_VAR:
+                    state = TODO
+                    break
+        return thunk(substitute(expr.left, env), state)
+    param = expr.name
+    body = expr.left
+    if param in env:
+        # The parameter shadows this binding inside the body
+        env = {key: value for key, value in env.items() if key != param}
+    avoid = None
+    for name, value in env.items():
+        if name in body.free_vars and param in value.free_vars:
+            avoid = set(body.free_vars)
+            for value in env.values():
+                avoid |= value.free_vars
+            break
+    if avoid is not None:
+        # The parameter would capture a free variable of a substituted value,
+        # so rename it as part of the same traversal
+        param = fresh_name(param, avoid)
+        env = dict(env)
+        env[expr.name] = var(param)
+    return lam(param, substitute(body, env))
+
+cdef Node force(Node node, dict context, frozenset bound):
+    if node.state != DONE:
+        node.left = normalize(node.left, context, bound)
+        node.state = DONE
+    return node.left
+
+cdef Node force_head(Node node, dict context, frozenset bound):
+    # The first use in head position unwinds the payload as it is; from the
+    # second on, its weak head normal form is computed once and kept
+    if node.state == TODO:
+        node.state = APPLIED
+    elif node.state == APPLIED:
+        node.left = whnf(node.left, context, bound)
+        node.state = WHNF
+    return node.left
+
+cdef Node contract(Node expr, list args):
+    # Binds the abstractions directly under `expr` to the pending arguments
+    # (last argument first) and substitutes them all at once; arguments left
+    # over once the abstractions run out stay on `args`
+    cdef dict env = {}
+    cdef Node arg
+    while args and expr.tag == TAG_LAM:
+        arg = <Node>args.pop()
+        if arg.tag == TAG_APP:
+            arg = thunk(arg, TODO)
+        env[expr.name] = arg  # A repeated parameter shadows the earlier binding
+        expr = expr.left
+    return substitute(expr, env)
+
+cpdef Node normalize(Node expr, dict context, frozenset bound=frozenset()):
+    """Reduces `expr` to normal form (leftmost-outermost first).
+
+    Free variables named in `context` are replaced by their Node definition,
+    except for the names in `bound`, which enclosing parameters shadow.
+    """
+    cdef Node body
+    cdef list args = []
+    while True:
+        if expr.tag == TAG_APP:
+            args.append(expr.right)
+            expr = expr.left
+        elif expr.tag == TAG_LAM:
+            if args:
+                # Head redex: contract it and continue with the result
+                expr = contract(expr, args)
+                continue
+            if expr.name in context and expr.name not in bound:
+                bound = bound | {expr.name}  # The parameter shadows the context entry
+            body = normalize(expr.left, context, bound)
+            return expr if body is expr.left else lam(expr.name, body)
+        elif expr.tag == TAG_VAR:
+            if expr.name not in context or expr.name in bound:
+                break
+            # Expand the named expression in head position and keep unwinding
+            expr = <Node?>context[expr.name]
+        else:
+            if not args:
+                return force(expr, context, bound)
+            # A shared argument in head position only needs its weak head normal form
+            expr = force_head(expr, context, bound)
+
+    # The spine is stuck on a free variable: only now normalize the arguments
+    while args:
+        expr = app(expr, normalize(<Node>args.pop(), context, bound))
+    return expr
+
+cdef Node whnf(Node expr, dict context, frozenset bound):
+    # Reduces `expr` to an abstraction, or to an application spine stuck on a
+    # free variable with its arguments left unreduced
+    cdef list args = []
+    while True:
+        if expr.tag == TAG_APP:
+            args.append(expr.right)
+            expr = expr.left
+        elif expr.tag == TAG_LAM:
+            if not args:
+                return expr
+            expr = contract(expr, args)
+        elif expr.tag == TAG_VAR:
+            if expr.name not in context or expr.name in bound:
+                break
+            expr = <Node?>context[expr.name]
+        else:
+            expr = force_head(expr, context, bound)
+
+    while args:
+        expr = app(expr, <Node>args.pop())
+    return expr
@@ -0,0 +1,95 @@
+import unittest
+
+import lc
+
+# λz. Ω: an abstraction whose body has no normal form
+DIVERGENT = "(λz. (λw. w w) (λw. w w))"
+
+class EvaluatorTest(unittest.TestCase):
+    """Reduces source text with `evaluate` and compares the printed result."""
+
+    evaluate = staticmethod(lc.interpret)
+
+    def reduce(self, source):
+        return repr(self.evaluate(lc.parse_expression(source)))
+
+class NormalOrderTest(EvaluatorTest):
+    """Terms that only terminate if operators are reduced to weak head normal form first."""
+
+    @classmethod
+    def setUpClass(cls):
+        lc.add_to_context("Y", lc.parse_expression("λf. (λx. f (x x)) (λx. f (x x))"))
+        lc.add_to_context("drop_divergent", lc.parse_expression(f"λx.λy. y {DIVERGENT}"))
+
+    def test_fixed_point_combinator(self):
+        self.assertEqual(self.reduce("Y (λr.λn. n) c"), "c")
+
+    def test_operator_with_divergent_normal_form(self):
+        self.assertEqual(self.reduce(f"(λx.λy. y {DIVERGENT}) a (λv. c)"), "c")
+
+    def test_named_operator_with_divergent_normal_form(self):
+        self.assertEqual(self.reduce("drop_divergent a (λv. c)"), "c")
+
+    def test_shared_operator_with_divergent_normal_form(self):
+        self.assertEqual(self.reduce(f"(λf. f (λv. c)) ((λx.λy. y {DIVERGENT}) a)"), "c")
+
+class BytecodeNormalOrderTest(NormalOrderTest):
+    """The same terms on the bytecode VM."""
+
+    evaluate = staticmethod(lc.interpret_bc)
+
+class ScopeTest(EvaluatorTest):
+    """Parameters shadow the context entries of the same name."""
+
+    @classmethod
+    def setUpClass(cls):
+        lc.add_to_context("shadowed", lc.parse_expression("λa. a"))
+
+    def test_parameter_shadows_definition(self):
+        self.assertEqual(self.reduce("λshadowed. shadowed"), "(λshadowed. shadowed)")
+
+    def test_parameter_in_head_position(self):
+        self.assertEqual(self.reduce("λshadowed. shadowed b"), "(λshadowed. (shadowed b))")
+
+    def test_definition_outside_the_binder(self):
+        self.assertEqual(self.reduce("(λshadowed. shadowed) shadowed b"), "b")
+
+class BytecodeScopeTest(ScopeTest):
+    """The same terms on the bytecode VM."""
+
+    evaluate = staticmethod(lc.interpret_bc)
+
+class RedefinitionTest(EvaluatorTest):
+    """Redefining a name reaches the definitions that refer to it."""
+
+    def test_redefinition_reaches_dependents(self):
+        lc.add_to_context("base", lc.parse_expression("λf.λx. x"))
+        lc.add_to_context("derived", lc.parse_expression("(λn.λf.λx. f (n f x)) base"))
+        lc.add_to_context("base", lc.parse_expression("λf.λy. f y"))
+        self.assertEqual(self.reduce("derived"), "(λf. (λx. (f (f x))))")
+
+class BytecodeRedefinitionTest(RedefinitionTest):
+    """The same terms on the bytecode VM."""
+
+    evaluate = staticmethod(lc.interpret_bc)
+
+class DeepTermTest(EvaluatorTest):
+    """Normal forms nested deeper than the recursion limit."""
+
+    @classmethod
+    def setUpClass(cls):
+        lc.add_to_context("exp", lc.parse_expression("λb.λe. e b"))
+        lc.add_to_context("two", lc.parse_expression("λf.λx. f (f x)"))
+        lc.add_to_context("ten", lc.parse_expression("λf.λx. f (f (f (f (f (f (f (f (f (f x)))))))))"))
+
+    def test_church_power(self):
+        # 2^10 as a Church numeral: two abstractions around 1024 applications
+        self.assertEqual(self.reduce("exp two ten").count("("), 1026)
+
+class BytecodeDeepTermTest(DeepTermTest):
+    """The same terms on the bytecode VM."""
+
+    evaluate = staticmethod(lc.interpret_bc)
+
+if __name__ == "__main__":
+    unittest.main()